@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+通用文件工具
+供修补引擎、搜索索引、价格汇总等脚本共用，写出的文件不会被读者看到写了一半的状态
+"""
+
+import os
+import tempfile
+
+
+def atomic_write(path: str, data: bytes):
+    """写入同目录临时文件后os.replace，保留原文件权限"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
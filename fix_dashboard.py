@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
-import re
+"""
+Dashboard修复脚本
+为dashboard.html及其各变体、admin_tool页面注入存储修复代码并切换Vue生产构建
+用法: python fix_dashboard.py [文件或glob ...]
+"""
 
-# 读取原始文件
-with open('dashboard.html', 'r', encoding='utf-8') as f:
-    content = f.read()
+import sys
+
+from html_patch_engine import PatchEngine, PatchRule, expand_targets, print_results
+
+DEFAULT_TARGETS = ['dashboard.html', 'dashboard_*.html', 'admin_tool/*.html']
 
 # 存储修复代码
 storage_fix_code = '''        // 存储修复工具
@@ -97,25 +103,43 @@ storage_fix_code = '''        // 存储修复工具
 
 '''
 
-# 在 const { createApp } = Vue; 之前插入存储修复代码
-content = content.replace(
-    '        const { createApp } = Vue;',
-    storage_fix_code + '        const { createApp } = Vue;'
-)
+RULES = [
+    # 在 const { createApp } = Vue; 之前插入存储修复代码（已注入过则跳过）
+    PatchRule(
+        'storage_fix',
+        '        const { createApp } = Vue;',
+        storage_fix_code + '        const { createApp } = Vue;',
+        unless='class StorageFix {'
+    ),
+    # 修复Vue版本
+    PatchRule('vue_prod', 'vue.global.js', 'vue.global.prod.js'),
+    # 替换存储调用
+    PatchRule('safe_storage', 'this.safeLocalStorage()', 'window.safeStorage'),
+    # 删除原有的safeLocalStorage方法
+    PatchRule(
+        'remove_safe_local_storage',
+        r'                safeLocalStorage\(\) \{.*?\},\s*',
+        '',
+        literal=False,
+        flags='s'
+    ),
+]
+
 
-# 修复Vue版本
-content = content.replace('vue.global.js', 'vue.global.prod.js')
+def main():
+    """主函数"""
+    targets = expand_targets(sys.argv[1:] or DEFAULT_TARGETS)
+    if not targets:
+        print("❌ 未找到需要修复的文件")
+        return
 
-# 替换存储调用
-content = content.replace('this.safeLocalStorage()', 'window.safeStorage')
+    engine = PatchEngine(RULES)
+    results = engine.run(targets)
+    print_results(results)
 
-# 删除原有的safeLocalStorage方法
-# 使用正则表达式删除整个方法
-pattern = r'                safeLocalStorage\(\) \{.*?\},\s*'
-content = re.sub(pattern, '', content, flags=re.DOTALL)
+    patched = sum(1 for r in results if r['status'] == 'patched')
+    print(f"\n✅ 修复完成: {patched}/{len(results)} 个文件已更新")
 
-# 写入修复后的文件
-with open('dashboard.html', 'w', encoding='utf-8') as f:
-    f.write(content)
 
-print("✅ dashboard.html 修复完成") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
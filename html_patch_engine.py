@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+HTML批量修补引擎
+将声明式的替换规则编译为一个组合正则，每个文件只扫描一遍；
+多文件并行处理，按内容哈希跳过已修补的文件，并以原子方式写回
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterable, Optional
+
+from file_utils import atomic_write
+
+STATE_FILE = '.html_patch_state.json'
+
+
+class PatchRule:
+    """单条替换规则：literal为普通字符串匹配，否则按正则匹配"""
+
+    def __init__(self, name: str, pattern: str, replacement: str,
+                 literal: bool = True, flags: str = '', unless: Optional[str] = None):
+        self.name = name
+        self.pattern = pattern
+        self.replacement = replacement
+        self.literal = literal
+        self.flags = flags  # 正则内联标志，如 's' 表示DOTALL
+        self.unless = unless  # 文件中已包含该标记时跳过此规则
+
+    def source(self) -> str:
+        """规则对应的正则片段，标志只作用于本规则"""
+        body = re.escape(self.pattern) if self.literal else self.pattern
+        return f'(?{self.flags}:{body})' if self.flags else f'(?:{body})'
+
+    def fingerprint(self) -> List[Any]:
+        return [self.name, self.pattern, self.replacement, self.literal, self.flags, self.unless]
+
+
+class PatchEngine:
+    def __init__(self, rules: List[PatchRule], state_file: str = STATE_FILE):
+        if not rules:
+            raise ValueError("至少需要一条修补规则")
+        self.rules = rules
+        self.state_file = state_file
+        self.ruleset_hash = hashlib.sha256(
+            json.dumps([r.fingerprint() for r in rules], ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        self._compiled: Dict[tuple, Any] = {}
+
+    def compile(self, active: tuple):
+        """把启用的规则合并为一个带命名分组的正则（按启用组合缓存）"""
+        combined = self._compiled.get(active)
+        if combined is None:
+            combined = re.compile('|'.join(
+                f'(?P<r{i}>{self.rules[i].source()})' for i in active
+            ))
+            self._compiled[active] = combined
+        return combined
+
+    def apply(self, content: str) -> tuple:
+        """单遍应用所有规则，返回(新内容, 每条规则的命中次数)
+
+        与逐条str.replace不同，替换结果不会被后续规则再次扫描；
+        同一位置有多条规则可匹配时，排在前面的规则优先
+        """
+        active = tuple(i for i, rule in enumerate(self.rules)
+                       if not (rule.unless and rule.unless in content))
+        counts = {rule.name: 0 for rule in self.rules}
+        if not active:
+            return content, counts
+
+        def substitute(match):
+            rule = self.rules[int(match.lastgroup[1:])]
+            counts[rule.name] += 1
+            return rule.replacement
+
+        return self.compile(active).sub(substitute, content), counts
+
+    def patch_file(self, path: str, known_hash: Optional[str] = None) -> Dict[str, Any]:
+        """修补单个文件；内容哈希与上次修补结果一致时直接跳过"""
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except Exception as e:
+            return {'path': path, 'status': 'error', 'error': str(e)}
+
+        digest = hashlib.sha256(raw).hexdigest()
+        if known_hash == digest:
+            return {'path': path, 'status': 'skipped', 'hash': digest}
+
+        try:
+            text = raw.decode('utf-8')
+        except UnicodeDecodeError as e:
+            return {'path': path, 'status': 'error', 'error': f"不是UTF-8编码: {e}"}
+
+        content, counts = self.apply(text)
+        if not any(counts.values()):
+            return {'path': path, 'status': 'unchanged', 'hash': digest, 'counts': counts}
+
+        data = content.encode('utf-8')
+        try:
+            atomic_write(path, data)
+        except Exception as e:
+            return {'path': path, 'status': 'error', 'error': str(e)}
+        return {'path': path, 'status': 'patched', 'hash': hashlib.sha256(data).hexdigest(), 'counts': counts}
+
+    def load_state(self) -> Dict[str, str]:
+        """读取上次运行记录的 文件->哈希；规则变化后记录作废"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ 读取修补状态失败，将重新检查全部文件: {e}")
+            return {}
+        if state.get('ruleset') != self.ruleset_hash:
+            return {}
+        return state.get('files', {})
+
+    def save_state(self, files: Dict[str, str]):
+        state = {'ruleset': self.ruleset_hash, 'files': files}
+        atomic_write(self.state_file, json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def run(self, paths: Iterable[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """并行修补多个文件并更新哈希状态"""
+        paths = sorted(set(paths))
+        state = self.load_state()
+        known = [state.get(os.path.abspath(p)) for p in paths]
+
+        if workers == 1 or len(paths) <= 1:
+            results = [self.patch_file(p, h) for p, h in zip(paths, known)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self.patch_file, paths, known))
+
+        for result in results:
+            if result.get('hash'):
+                state[os.path.abspath(result['path'])] = result['hash']
+        self.save_state(state)
+        return results
+
+
+def expand_targets(patterns: Iterable[str]) -> List[str]:
+    """展开glob模式为文件列表"""
+    paths = []
+    for pattern in patterns:
+        paths.extend(p for p in glob.glob(pattern) if os.path.isfile(p))
+    return paths
+
+
+def print_results(results: List[Dict[str, Any]]):
+    icons = {'patched': '✅', 'skipped': '⏭️', 'unchanged': '➖', 'error': '❌'}
+    for result in results:
+        line = f"{icons[result['status']]} {result['path']}: {result['status']}"
+        if result['status'] == 'patched':
+            hits = ', '.join(f"{name}×{n}" for name, n in result['counts'].items() if n)
+            line += f" ({hits})"
+        elif result['status'] == 'error':
+            line += f" - {result['error']}"
+        print(line)
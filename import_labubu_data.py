@@ -4,15 +4,48 @@ Labubu数据导入脚本
 将sample_data.json中的数据批量导入到Supabase数据库
 """
 
+import glob
 import json
-import requests
+import os
+import sys
 import uuid
+import zlib
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+# 固定命名空间，使同一系列/模型在多次/分片导入中得到相同的ID
+SERIES_NAMESPACE = uuid.UUID('6f1c2a4e-5b7d-4c8e-9a0b-1d2e3f4a5b6c')
+MODEL_NAMESPACE = uuid.UUID('ccd40f34-7976-467b-8243-999b26b04ebc')
+UPSERT_PREFER = 'return=minimal,resolution=merge-duplicates'
+
+# 批次文件名前缀与目标表，按外键依赖顺序上传
+BATCH_TABLES = (
+    ('series', 'labubu_series'),
+    ('models', 'labubu_models'),
+    ('reference_images', 'labubu_reference_images'),
+    ('visual_features', 'labubu_visual_features'),
+)
+
+def select_shard(models_data: List[Dict], shard: Optional[tuple] = None) -> List[Dict]:
+    """按model_number的稳定哈希选取第i/N个分片的模型，shard为None时返回全部"""
+    if not shard:
+        return list(models_data)
+    index, count = shard
+    return [
+        model for model in models_data
+        if zlib.crc32(str(model.get('model_number') or model.get('name')).encode('utf-8')) % count == index
+    ]
+
+def transform_error(error: Exception) -> str:
+    """转换记录时异常的说明，导入与dry-run共用"""
+    if isinstance(error, KeyError):
+        return f"缺少字段 {error}"
+    return f"{type(error).__name__}: {error}"
 
 class LabubuDataImporter:
-    def __init__(self, supabase_url: str, service_role_key: str):
+    def __init__(self, supabase_url: str, service_role_key: str, search_index=None):
         self.supabase_url = supabase_url.rstrip('/')
+        self.search_index = search_index  # 可选的ModelSearchIndex，导入成功的模型会增量写入
         self.headers = {
             'apikey': service_role_key,
             'Authorization': f'Bearer {service_role_key}',
@@ -29,28 +62,51 @@ class LabubuDataImporter:
             print(f"❌ 加载数据文件失败: {e}")
             return {}
     
-    def import_series(self, series_data: List[Dict]) -> Dict[str, str]:
-        """导入系列数据，返回系列名称到ID的映射"""
+    def series_id_for(self, series_name: str) -> str:
+        """根据系列名称生成确定性的系列ID"""
+        return str(uuid.uuid5(SERIES_NAMESPACE, series_name))
+    
+    def model_id_for(self, model: Dict) -> str:
+        """根据model_number（缺失时用名称，与分片键一致）生成确定性的模型ID"""
+        return str(uuid.uuid5(MODEL_NAMESPACE, str(model.get('model_number') or model.get('name'))))
+    
+    def build_series_record(self, series: Dict) -> Dict[str, Any]:
+        """将sample_data中的系列转换为labubu_series记录（只含supabase_database_setup.sql中的列）"""
+        return {
+            'id': self.series_id_for(series['name']),
+            'name': series['name'],
+            'name_en': series.get('name_en'),
+            'description': series.get('description'),
+            'release_year': series.get('release_year'),
+            'total_models': series.get('total_models'),
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+    
+    def import_series(self, series_data: List[Dict]) -> Tuple[Dict[str, str], int]:
+        """导入系列数据，返回(系列名称到ID的映射, 失败数量)
+        
+        系列ID由名称确定并以upsert方式写入，分片并行导入时各进程可重复执行而不产生重复系列
+        """
+        import requests
+        
         series_mapping = {}
+        failed = 0
+        headers = {**self.headers, 'Prefer': UPSERT_PREFER}
         
         for series in series_data:
-            series_id = str(uuid.uuid4())
-            series_record = {
-                'id': series_id,
-                'name': series['name'],
-                'name_en': series['name_en'],
-                'description': series['description'],
-                'release_year': series['release_year'],
-                'total_models': series['total_models'],
-                'theme': series['theme'],
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
+            try:
+                series_record = self.build_series_record(series)
+            except Exception as e:
+                print(f"❌ 跳过系列 {series.get('name', 'Unknown')}：{transform_error(e)}")
+                failed += 1
+                continue
+            series_id = series_record['id']
             
             try:
                 response = requests.post(
                     f"{self.supabase_url}/rest/v1/labubu_series",
-                    headers=self.headers,
+                    headers=headers,
                     json=series_record
                 )
                 
@@ -59,91 +115,135 @@ class LabubuDataImporter:
                     print(f"✅ 导入系列: {series['name']}")
                 else:
                     print(f"❌ 导入系列失败: {series['name']} - {response.text}")
+                    failed += 1
                     
             except Exception as e:
                 print(f"❌ 导入系列异常: {series['name']} - {e}")
+                failed += 1
         
-        return series_mapping
+        return series_mapping, failed
     
-    def import_models(self, models_data: List[Dict], series_mapping: Dict[str, str]):
-        """导入模型数据"""
+    def build_model_record(self, model: Dict, series_id: str) -> Dict[str, Any]:
+        """将sample_data中的模型转换为labubu_models记录（只含supabase_database_setup.sql中的列）"""
+        return {
+            'id': self.model_id_for(model),
+            'series_id': series_id,
+            'name': model.get('name'),
+            'name_en': model.get('name_en'),
+            'model_number': model.get('model_number'),
+            'description': model.get('description'),
+            'rarity_level': model.get('rarity_level'),
+            'estimated_price_min': model.get('estimated_price_min'),
+            'estimated_price_max': model.get('estimated_price_max'),
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+    
+    def build_model_children(self, model: Dict, model_id: str) -> Dict[str, List[Dict]]:
+        """将参考图片与视觉特征转换为各自子表的记录，返回 表名 -> 记录列表；ID由模型ID确定"""
+        # 处理参考图片
+        reference_images = []
+        for order, img in enumerate(model.get('reference_images', [])):
+            reference_images.append({
+                'id': str(uuid.uuid5(MODEL_NAMESPACE, f"{model_id}:{img['url']}")),
+                'model_id': model_id,
+                'image_url': img['url'],
+                'image_type': self.map_image_type(img.get('type')),
+                'is_primary': bool(img.get('is_primary', False)),
+                'sort_order': order,
+                'created_at': datetime.now().isoformat()
+            })
+        
+        # 处理视觉特征
+        visual_features = []
+        features = model.get('visual_features')
+        if features:
+            visual_features.append({
+                'id': str(uuid.uuid5(MODEL_NAMESPACE, f"{model_id}:visual_features")),
+                'model_id': model_id,
+                'dominant_colors': features.get('dominant_colors', []),
+                'color_distribution': self.process_colors(features.get('dominant_colors', [])),
+                'body_shape': features.get('body_shape'),
+                'head_shape': features.get('head_shape'),
+                'ear_type': features.get('ear_type'),
+                'surface_texture': features.get('surface_texture'),
+                'pattern_type': features.get('pattern_type'),
+                'height_cm': features.get('height_cm'),
+                'width_cm': features.get('width_cm'),
+                'depth_cm': features.get('depth_cm'),
+                'special_marks': features.get('special_marks'),
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            })
+        
+        return {
+            'labubu_reference_images': reference_images,
+            'labubu_visual_features': visual_features,
+        }
+    
+    def import_models(self, models_data: List[Dict], series_mapping: Dict[str, str]) -> int:
+        """导入模型及其参考图片、视觉特征，返回未完整写入的模型数量（含被跳过的）
+        
+        各记录ID由model_number确定并以upsert方式写入，重跑失败的分片不会产生重复记录
+        """
+        import requests
+        
+        failed = 0
+        headers = {**self.headers, 'Prefer': UPSERT_PREFER}
         for model in models_data:
-            model_id = str(uuid.uuid4())
-            series_id = series_mapping.get(model['series_name'])
+            series_id = series_mapping.get(model.get('series_name'))
             
             if not series_id:
-                print(f"⚠️ 跳过模型 {model['name']}：找不到对应系列")
+                print(f"⚠️ 跳过模型 {model.get('name', 'Unknown')}：找不到对应系列")
+                failed += 1
                 continue
             
-            # 处理参考图片
-            reference_images = []
-            for img in model.get('reference_images', []):
-                reference_images.append({
-                    'id': str(uuid.uuid4()),
-                    'image_url': img['url'],
-                    'angle': self.map_image_type(img['type']),
-                    'upload_date': datetime.now().isoformat()
-                })
-            
-            # 处理视觉特征
-            visual_features = model.get('visual_features', {})
-            processed_features = {
-                'primary_colors': self.process_colors(visual_features.get('dominant_colors', [])),
-                'color_distribution': {},
-                'shape_descriptor': {
-                    'aspect_ratio': visual_features.get('height_cm', 6.5) / visual_features.get('width_cm', 4.2),
-                    'roundness': 0.8,  # 默认值，可根据body_shape调整
-                    'symmetry': 0.9,
-                    'complexity': 0.6,
-                    'key_points': []
-                },
-                'texture_features': {
-                    'smoothness': 0.8 if visual_features.get('surface_texture') == '光滑' else 0.4,
-                    'roughness': 0.2 if visual_features.get('surface_texture') == '光滑' else 0.6,
-                    'patterns': [visual_features.get('pattern_type', '纯色')],
-                    'material_type': 'plush'
-                },
-                'special_marks': [visual_features.get('special_marks', '')],
-                'feature_vector': visual_features.get('feature_vector', [0.5] * 10)
-            }
-            
-            model_record = {
-                'id': model_id,
-                'name': model['name_en'],
-                'name_cn': model['name'],
-                'series_id': series_id,
-                'variant': 'standard',
-                'rarity': model['rarity_level'],
-                'release_date': model.get('release_date'),
-                'original_price': model.get('original_price'),
-                'reference_images': reference_images,
-                'visual_features': processed_features,
-                'tags': self.extract_tags(model),
-                'description': model.get('description'),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
+            try:
+                model_record = self.build_model_record(model, series_id)
+                children = self.build_model_children(model, model_record['id'])
+            except Exception as e:
+                print(f"❌ 跳过模型 {model.get('name', 'Unknown')}：{transform_error(e)}")
+                failed += 1
+                continue
             
             try:
                 response = requests.post(
                     f"{self.supabase_url}/rest/v1/labubu_models",
-                    headers=self.headers,
+                    headers=headers,
                     json=model_record
                 )
+                if response.status_code not in [200, 201]:
+                    print(f"❌ 导入模型失败: {model.get('name')} - {response.text}")
+                    failed += 1
+                    continue
                 
-                if response.status_code in [200, 201]:
-                    print(f"✅ 导入模型: {model['name']}")
-                else:
-                    print(f"❌ 导入模型失败: {model['name']} - {response.text}")
+                # 子表记录引用模型ID，须在模型写入后提交
+                for table, records in children.items():
+                    if not records:
+                        continue
+                    response = requests.post(
+                        f"{self.supabase_url}/rest/v1/{table}",
+                        headers=headers,
+                        json=records
+                    )
+                    if response.status_code not in [200, 201]:
+                        raise RuntimeError(f"{table} 写入失败: {response.text}")
+                
+                print(f"✅ 导入模型: {model.get('name')}")
+                if self.search_index is not None:
+                    self.search_index.upsert(model)
                     
             except Exception as e:
-                print(f"❌ 导入模型异常: {model['name']} - {e}")
+                print(f"❌ 导入模型异常: {model.get('name')} - {e}")
+                failed += 1
+        
+        return failed
     
     def map_image_type(self, image_type: str) -> str:
-        """映射图片类型"""
+        """映射图片类型到labubu_reference_images.image_type的取值"""
         mapping = {
             'official_front': 'front',
-            'official_side': 'left',
+            'official_side': 'side',
             'official_back': 'back',
             'user_photo': 'front',
             'detail': 'detail'
@@ -180,7 +280,8 @@ class LabubuDataImporter:
             tags.append(visual['ear_type'])
         
         # 添加稀有度标签
-        tags.append(model['rarity_level'])
+        if model.get('rarity_level'):
+            tags.append(model['rarity_level'])
         
         return tags
     
@@ -197,42 +298,95 @@ class LabubuDataImporter:
         }
         return color_map.get(hex_color.upper(), '')
     
-    def run_import(self):
-        """执行完整的数据导入流程"""
+    def run_import(self, file_path: str = 'sample_data.json', shard: Optional[tuple] = None) -> bool:
+        """执行完整的数据导入流程，shard=(i, N)时只导入第i个分片的模型；全部写入成功时返回True"""
         print("🚀 开始导入Labubu数据...")
         
         # 加载数据
-        data = self.load_sample_data()
+        data = self.load_sample_data(file_path)
         if not data:
-            return
+            return False
+        models_data = select_shard(data.get('models', []), shard)
         
         # 导入系列
         print("\n📚 导入系列数据...")
-        series_mapping = self.import_series(data.get('series', []))
+        series_mapping, failed_series = self.import_series(data.get('series', []))
         
         # 导入模型
         print(f"\n🎭 导入模型数据...")
-        self.import_models(data.get('models', []), series_mapping)
+        failed_models = self.import_models(models_data, series_mapping)
+        
+        if self.search_index is not None:
+            self.search_index.save()
+        
+        if failed_series or failed_models:
+            print(f"\n⚠️ 数据导入完成，但有记录写入失败")
+        else:
+            print(f"\n✅ 数据导入完成！")
+        print(f"   - 系列数量: {len(series_mapping)}（失败 {failed_series}）")
+        print(f"   - 模型数量: {len(models_data) - failed_models}（失败 {failed_models}）")
+        return not failed_series and not failed_models
+    
+    def upload_batches(self, batch_dir: str) -> int:
+        """按外键顺序上传dry-run生成的批次文件（见BATCH_TABLES），不再做转换
+        
+        返回写入失败的记录数；无法读取的批次文件记录数未知，按1计
+        """
+        import requests
+        
+        print("🚀 开始上传预处理批次...")
+        
+        headers = {**self.headers, 'Prefer': UPSERT_PREFER}
+        batch_files = [
+            (path, table) for prefix, table in BATCH_TABLES
+            for path in sorted(glob.glob(os.path.join(batch_dir, f'{prefix}*.json')))
+        ]
+        
+        uploaded = {table: 0 for _, table in BATCH_TABLES}
+        failed = 0
+        for path, table in batch_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except Exception as e:
+                print(f"❌ 读取批次失败: {path} - {e}")
+                failed += 1
+                continue
+            if not records:
+                continue
+            
+            try:
+                response = requests.post(
+                    f"{self.supabase_url}/rest/v1/{table}",
+                    headers=headers,
+                    json=records
+                )
+                
+                if response.status_code in [200, 201]:
+                    uploaded[table] += len(records)
+                    print(f"✅ 上传批次: {os.path.basename(path)} ({len(records)} 条)")
+                else:
+                    print(f"❌ 上传批次失败: {os.path.basename(path)} - {response.text}")
+                    failed += len(records)
+                    
+            except Exception as e:
+                print(f"❌ 上传批次异常: {os.path.basename(path)} - {e}")
+                failed += len(records)
         
-        print(f"\n✅ 数据导入完成！")
-        print(f"   - 系列数量: {len(series_mapping)}")
-        print(f"   - 模型数量: {len(data.get('models', []))}")
+        if failed:
+            print(f"\n⚠️ 批次上传完成，{failed} 条记录写入失败")
+        else:
+            print(f"\n✅ 批次上传完成！")
+        print(f"   - 系列数量: {uploaded['labubu_series']}")
+        print(f"   - 模型数量: {uploaded['labubu_models']}")
+        print(f"   - 参考图片数量: {uploaded['labubu_reference_images']}")
+        print(f"   - 视觉特征数量: {uploaded['labubu_visual_features']}")
+        return failed
 
 def main():
-    """主函数"""
-    print("=== Labubu数据导入工具 ===\n")
-    
-    # 配置信息（请替换为您的实际配置）
-    SUPABASE_URL = input("请输入Supabase URL: ").strip()
-    SERVICE_ROLE_KEY = input("请输入Service Role Key: ").strip()
-    
-    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
-        print("❌ 配置信息不完整，请重新运行脚本")
-        return
-    
-    # 创建导入器并执行导入
-    importer = LabubuDataImporter(SUPABASE_URL, SERVICE_ROLE_KEY)
-    importer.run_import()
+    """主函数，等同于 python labubu_cli.py import"""
+    from labubu_cli import main as cli_main
+    sys.exit(cli_main(['import'] + sys.argv[1:]))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Labubu数据工具统一命令行
+子命令: import（导入）、verify（验证）、dry-run（离线校验与转换）、upload（上传预处理批次）
+配置从命令行参数或环境变量SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY读取，无需交互输入；
+导入脚本与requests均按需延迟加载，--help与试运行可快速启动
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+def parse_shard(value: str) -> tuple:
+    """解析 --shard i/N，i从0开始"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 i/N，例如 0/4: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"分片编号超出范围: {value}")
+    return index, count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='labubu_cli.py', description='Labubu数据导入与验证工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_connection_args(sub):
+        sub.add_argument('--url', default=os.environ.get('SUPABASE_URL'),
+                         help='Supabase URL（默认读取环境变量SUPABASE_URL）')
+        sub.add_argument('--key', default=os.environ.get('SUPABASE_SERVICE_ROLE_KEY'),
+                         help='Service Role Key（默认读取环境变量SUPABASE_SERVICE_ROLE_KEY）')
+
+    def add_data_args(sub):
+        sub.add_argument('--data', default='sample_data.json', help='数据文件路径')
+        sub.add_argument('--shard', type=parse_shard, default=None,
+                         help='只处理第i/N个分片的模型，供多进程或多机并行运行')
+
+    import_parser = subparsers.add_parser('import', help='导入系列与模型到Supabase')
+    add_connection_args(import_parser)
+    add_data_args(import_parser)
+    import_parser.add_argument('--search-index', default=None,
+                               help='同时增量更新该路径的模型搜索索引')
+
+    verify_parser = subparsers.add_parser('verify', help='验证Supabase中的数据')
+    add_connection_args(verify_parser)
+    verify_parser.add_argument('--report', default='labubu_verification_report.txt', help='报告输出路径')
+
+    dry_run_parser = subparsers.add_parser('dry-run', help='按表结构离线校验并转换数据，不连接数据库')
+    add_data_args(dry_run_parser)
+    dry_run_parser.add_argument('--schema', default='supabase_database_setup.sql', help='建表SQL文件')
+    dry_run_parser.add_argument('--out', default=None, help='写出上传批次与错误报告的目录')
+    dry_run_parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认CPU核数）')
+
+    upload_parser = subparsers.add_parser('upload', help='上传dry-run --out生成的批次')
+    add_connection_args(upload_parser)
+    upload_parser.add_argument('batch_dir', help='批次目录')
+
+    return parser
+
+
+def require_connection(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    if not args.url or not args.key:
+        parser.error("配置信息不完整：请通过 --url/--key 或环境变量 SUPABASE_URL/SUPABASE_SERVICE_ROLE_KEY 提供")
+
+
+def run_import(args: argparse.Namespace) -> int:
+    from import_labubu_data import LabubuDataImporter
+
+    search_index = None
+    if args.search_index:
+        from labubu_search_index import ModelSearchIndex
+        search_index = ModelSearchIndex(args.search_index)
+        search_index.load()
+
+    print("=== Labubu数据导入工具 ===\n")
+    importer = LabubuDataImporter(args.url, args.key, search_index=search_index)
+    return 0 if importer.run_import(args.data, shard=args.shard) else 1
+
+
+def run_verify(args: argparse.Namespace) -> int:
+    from verify_import import LabubuDataVerifier
+
+    print("=== Labubu数据验证工具 ===\n")
+    verifier = LabubuDataVerifier(args.url, args.key)
+    report = verifier.generate_report()
+
+    print("\n" + report)
+
+    # 保存报告到文件
+    with open(args.report, 'w', encoding='utf-8') as f:
+        f.write(report)
+
+    print(f"📄 验证报告已保存到: {args.report}")
+    return 0 if verifier.success else 1
+
+
+def run_dry_run(args: argparse.Namespace) -> int:
+    from labubu_schema_validator import validate_and_transform, print_summary
+
+    print("=== Labubu数据离线校验 ===\n")
+    try:
+        result = validate_and_transform(args.data, schema_file=args.schema, out_dir=args.out,
+                                        shard=args.shard, workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"❌ 加载表结构失败: {args.schema} - {e}")
+        return 1
+    if result is None:
+        return 1
+    print_summary(result, args.out)
+    return 1 if result['errors'] else 0
+
+
+def run_upload(args: argparse.Namespace) -> int:
+    from import_labubu_data import LabubuDataImporter
+
+    print("=== Labubu批次上传工具 ===\n")
+    importer = LabubuDataImporter(args.url, args.key)
+    return 0 if importer.upload_batches(args.batch_dir) == 0 else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command in ('import', 'verify', 'upload'):
+        require_connection(parser, args)
+    if args.command == 'import' and args.search_index and args.shard:
+        # 各分片会并发读写同一个索引文件，互相覆盖更新
+        parser.error("--search-index 不能与 --shard 同时使用，请在分片导入完成后重建索引")
+
+    handlers = {
+        'import': run_import,
+        'verify': run_verify,
+        'dry-run': run_dry_run,
+        'upload': run_upload,
+    }
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
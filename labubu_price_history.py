@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Labubu价格历史时序引擎
+将sample_data.json中的price_history按(模型, 币种, 成色)分段加载为列式内存存储，
+计算逐日滚动最小/最大/中位数、波动率以及按系列/稀有度的价格指数，
+并将结果物化为增量更新的汇总文件，供仪表盘直接读取
+"""
+
+import hashlib
+import json
+import math
+import statistics
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from file_utils import atomic_write
+
+SUMMARY_VERSION = 3
+DEFAULT_CURRENCY = 'CNY'  # 与labubu_price_history.currency的默认值一致
+
+
+def segment_key(currency: str, condition: str) -> str:
+    """分段键，如 CNY:new；不同币种或成色的价格不放在同一序列中比较"""
+    return f"{currency}:{condition}"
+
+
+class PriceSeries:
+    """单个模型的列式价格序列（按日期升序）"""
+
+    __slots__ = ('days', 'prices', 'sorted')
+
+    def __init__(self):
+        self.days = array('l')
+        self.prices = array('d')
+        self.sorted = True
+
+    def append(self, day: int, price: float):
+        if self.days and day < self.days[-1]:
+            self.sorted = False
+        self.days.append(day)
+        self.prices.append(price)
+
+    def ensure_sorted(self):
+        """乱序写入后按日期重新排列两列"""
+        if self.sorted:
+            return
+        order = sorted(range(len(self.days)), key=self.days.__getitem__)
+        self.days = array('l', (self.days[i] for i in order))
+        self.prices = array('d', (self.prices[i] for i in order))
+        self.sorted = True
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+class PriceHistoryStore:
+    def __init__(self, window_days: int = 30):
+        self.window_days = window_days
+        self.series: Dict[Tuple[str, str], PriceSeries] = {}  # (模型编号, 分段键) -> 序列
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.summary: Dict[str, Dict[str, Dict[str, Any]]] = {}  # 模型编号 -> 分段键 -> 汇总
+
+    def load_sample_data(self, file_path: str = 'sample_data.json') -> Dict[str, Any]:
+        """加载sample_data.json文件"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"❌ 加载数据文件失败: {e}")
+            return {}
+
+    def load_models(self, models_data: List[Dict]):
+        """登记模型元数据（系列、稀有度、估价区间）"""
+        for model in models_data:
+            model_number = model.get('model_number')
+            if not model_number:
+                continue
+            self.models[model_number] = {
+                'series_name': model.get('series_name'),
+                'rarity_level': model.get('rarity_level'),
+                'estimated_price_min': model.get('estimated_price_min'),
+                'estimated_price_max': model.get('estimated_price_max'),
+                'original_price': model.get('original_price'),
+                'currency': model.get('currency') or DEFAULT_CURRENCY,
+            }
+
+    def add_points(self, points: Iterable[Dict]) -> int:
+        """追加价格点，按币种与成色分段，返回写入条数"""
+        added = 0
+        for point in points:
+            model_number = point.get('model_number')
+            price = self.parse_price(point.get('price'))
+            day = self.parse_day(point.get('date') or point.get('recorded_at'))
+            if not model_number or price is None or day is None:
+                print(f"⚠️ 跳过无效价格记录: {point}")
+                continue
+
+            segment = segment_key(point.get('currency') or DEFAULT_CURRENCY, point.get('condition') or 'unknown')
+            series = self.series.get((model_number, segment))
+            if series is None:
+                series = self.series[(model_number, segment)] = PriceSeries()
+            series.append(day, price)
+            added += 1
+        return added
+
+    def parse_price(self, value: Any) -> Optional[float]:
+        """将价格转换为有限浮点数，无法转换时返回None"""
+        if value is None or isinstance(value, bool):
+            return None
+        try:
+            price = float(value)
+        except (TypeError, ValueError):
+            return None
+        return price if math.isfinite(price) else None
+
+    def parse_day(self, value: Optional[str]) -> Optional[int]:
+        """将日期/时间戳字符串转换为序数日"""
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(str(value)[:10]).toordinal()
+        except ValueError:
+            return None
+
+    def rolling_points(self, series: PriceSeries) -> List[Dict[str, Any]]:
+        """逐日滚动统计：每个有价格点的日期取其之前window_days天（含当天）的窗口"""
+        days, prices = series.days, series.prices
+        points = []
+        for end, day in enumerate(days):
+            if end + 1 < len(days) and days[end + 1] == day:
+                continue  # 同一天的多个价格点只在最后一个位置输出
+            window = prices[bisect_left(days, day - self.window_days + 1):end + 1]
+            points.append({
+                'date': date.fromordinal(day).isoformat(),
+                'count': len(window),
+                'min': min(window),
+                'max': max(window),
+                'median': statistics.median(window),
+            })
+        return points
+
+    def compute_model_summary(self, model_number: str, segment: str) -> Dict[str, Any]:
+        """计算单个模型某一分段的全量与逐日滚动统计"""
+        series = self.series[(model_number, segment)]
+        series.ensure_sorted()
+        prices = series.prices
+        days = series.days
+
+        # 相邻价格点的对数收益率标准差作为波动率，收益率不足两个时无法估计
+        returns = [math.log(b / a) for a, b in zip(prices, prices[1:]) if a > 0 and b > 0]
+        volatility = round(statistics.pstdev(returns), 6) if len(returns) > 1 else None
+
+        meta = self.models.get(model_number, {})
+        currency, condition = segment.split(':', 1)
+        # 估价区间以模型币种计价，其他币种的价格不计算指数
+        baseline = self.baseline_price(meta) if currency == meta.get('currency', DEFAULT_CURRENCY) else None
+        latest = prices[-1]
+
+        return {
+            'currency': currency,
+            'condition': condition,
+            'point_count': len(series),
+            'first_date': date.fromordinal(days[0]).isoformat(),
+            'latest_date': date.fromordinal(days[-1]).isoformat(),
+            'latest_price': latest,
+            'min_price': min(prices),
+            'max_price': max(prices),
+            'median_price': statistics.median(prices),
+            'rolling': {
+                'window_days': self.window_days,
+                'points': self.rolling_points(series),
+            },
+            'volatility': volatility,
+            'price_index': round(latest / baseline, 6) if baseline else None,
+            'series_name': meta.get('series_name'),
+            'rarity_level': meta.get('rarity_level'),
+        }
+
+    def baseline_price(self, meta: Dict[str, Any]) -> Optional[float]:
+        """价格指数基准：估价区间中点，缺失时退回原价"""
+        low = meta.get('estimated_price_min')
+        high = meta.get('estimated_price_max')
+        if low is not None and high is not None:
+            return (float(low) + float(high)) / 2
+        if meta.get('original_price'):
+            return float(meta['original_price'])
+        return None
+
+    def fingerprint(self, model_number: str, segment: str) -> str:
+        """分段全部价格点与模型元数据的哈希，任一变化都会使缓存失效"""
+        series = self.series[(model_number, segment)]
+        series.ensure_sorted()
+        digest = hashlib.sha256()
+        digest.update(series.days.tobytes())
+        digest.update(series.prices.tobytes())
+        meta = self.models.get(model_number, {})
+        digest.update(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def refresh_summary(self) -> List[str]:
+        """增量刷新汇总，只重算指纹与缓存不一致的分段，并移除已无价格序列的分段，返回被重算的模型编号"""
+        stale = set()
+        for model_number, segment in self.series:
+            fingerprint = self.fingerprint(model_number, segment)
+            segments = self.summary.setdefault(model_number, {})
+            cached = segments.get(segment)
+            if cached is None or cached.get('fingerprint') != fingerprint:
+                summary = self.compute_model_summary(model_number, segment)
+                summary['fingerprint'] = fingerprint
+                segments[segment] = summary
+                stale.add(model_number)
+
+        for model_number, segments in list(self.summary.items()):
+            for segment in [s for s in segments if (model_number, s) not in self.series]:
+                del segments[segment]
+            if not segments:
+                del self.summary[model_number]
+
+        return sorted(stale)
+
+    def group_index(self, field: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """按series_name或rarity_level聚合价格指数，每组内再按分段聚合（基于已物化的模型汇总）"""
+        groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for segments in self.summary.values():
+            for segment, summary in segments.items():
+                key = summary.get(field) or 'unknown'
+                groups.setdefault(key, {}).setdefault(segment, []).append(summary)
+
+        result = {}
+        for key, segments in groups.items():
+            result[key] = {}
+            for segment, items in segments.items():
+                indices = [s['price_index'] for s in items if s.get('price_index') is not None]
+                volatilities = [s['volatility'] for s in items if s.get('volatility') is not None]
+                result[key][segment] = {
+                    'model_count': len(items),
+                    'price_index': round(statistics.fmean(indices), 6) if indices else None,
+                    'median_price': statistics.median(s['latest_price'] for s in items),
+                    'volatility': round(statistics.fmean(volatilities), 6) if volatilities else None,
+                }
+        return result
+
+    def save_summary(self, file_path: str = 'labubu_price_summary.json'):
+        """物化汇总到JSON文件（临时文件+os.replace，仪表盘不会读到写了一半的文件）"""
+        payload = {
+            'version': SUMMARY_VERSION,
+            'generated_at': datetime.now().isoformat(),
+            'window_days': self.window_days,
+            'models': self.summary,
+            'by_series': self.group_index('series_name'),
+            'by_rarity': self.group_index('rarity_level'),
+        }
+        atomic_write(file_path, json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def load_summary(self, file_path: str = 'labubu_price_summary.json') -> bool:
+        """读取已物化的汇总作为增量刷新的缓存"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ 读取价格汇总失败，将全量重算: {e}")
+            return False
+
+        if payload.get('version') != SUMMARY_VERSION or payload.get('window_days') != self.window_days:
+            return False
+        self.summary = payload.get('models', {})
+        return True
+
+    def run(self, data_file: str = 'sample_data.json', summary_file: str = 'labubu_price_summary.json'):
+        """加载价格历史并增量更新汇总文件"""
+        print("📈 开始计算Labubu价格汇总...")
+
+        data = self.load_sample_data(data_file)
+        if not data:
+            return
+
+        self.load_models(data.get('models', []))
+        self.load_summary(summary_file)
+        added = self.add_points(data.get('price_history', []))
+        updated = self.refresh_summary()
+        self.save_summary(summary_file)
+
+        print(f"\n✅ 价格汇总完成！")
+        print(f"   - 价格点数量: {added}")
+        print(f"   - 价格序列数量: {len(self.series)}")
+        print(f"   - 更新模型数量: {len(updated)}")
+        print(f"   - 汇总文件: {summary_file}")
+
+
+def main():
+    """主函数"""
+    print("=== Labubu价格历史工具 ===\n")
+
+    store = PriceHistoryStore()
+    store.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Labubu离线校验与转换
+从supabase_database_setup.sql解析系列、模型及其参考图片/视觉特征子表的表结构，每次运行只编译一次校验器；
+多进程转换全部输入记录并按表结构校验实际要上传的记录（含表中不存在的列），
+不访问网络即可得到完整错误报告，并把可直接上传的批次写入磁盘，之后的上传只剩纯I/O
+"""
+
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+from typing import Dict, List, Any, Optional, Tuple
+
+from file_utils import atomic_write
+from import_labubu_data import BATCH_TABLES, LabubuDataImporter, select_shard, transform_error
+
+SCHEMA_FILE = 'supabase_database_setup.sql'
+SCHEMA_TABLES = tuple(table for _, table in BATCH_TABLES)
+BATCH_SIZE = 500
+MAX_PRINTED_ERRORS = 50
+
+# 转换逻辑直接依赖的输入字段（系列ID由名称生成，模型按series_name关联系列），缺失时无法转换
+TRANSFORM_INPUTS = {
+    'labubu_series': ('name',),
+    'labubu_models': ('series_name',),
+}
+
+_TABLE_RE = re.compile(r'CREATE TABLE (?:IF NOT EXISTS )?(?:\w+\.)?(\w+)\s*\((.*?)\n\);', re.S | re.I)
+_COLUMN_RE = re.compile(
+    r'^(\w+)\s+([a-z]\w*(?:\s+(?:precision|varying))?)(?:\s*\(([\d,\s]+)\))?((?:\s*\[\])*)(.*)$', re.I
+)
+_CONSTRAINT_WORDS = {'PRIMARY', 'FOREIGN', 'CONSTRAINT', 'UNIQUE', 'CHECK'}
+
+
+def check_string(value, params) -> Optional[str]:
+    if not isinstance(value, str):
+        return f"应为字符串，实际为 {type(value).__name__}"
+    max_length = params.get('max_length')
+    if max_length is not None and len(value) > max_length:
+        return f"长度 {len(value)} 超过上限 {max_length}"
+    choices = params.get('choices')
+    if choices and value not in choices:
+        return f"取值 {value!r} 不在允许范围 {', '.join(choices)}"
+    return None
+
+
+def check_integer(value, params) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, int):
+        return f"应为整数，实际为 {type(value).__name__}"
+    return None
+
+
+def check_decimal(value, params) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return f"应为数值，实际为 {type(value).__name__}"
+    if 'precision' in params:
+        limit = 10 ** (params['precision'] - params['scale'])
+        if abs(value) >= limit:
+            return f"数值 {value} 超出 DECIMAL({params['precision']},{params['scale']}) 范围"
+    return None
+
+
+def check_boolean(value, params) -> Optional[str]:
+    if not isinstance(value, bool):
+        return f"应为布尔值，实际为 {type(value).__name__}"
+    return None
+
+
+def check_uuid(value, params) -> Optional[str]:
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return f"不是合法的UUID: {value!r}"
+    return None
+
+
+def check_timestamp(value, params) -> Optional[str]:
+    try:
+        datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return f"不是合法的时间: {value!r}"
+    return None
+
+
+def check_date(value, params) -> Optional[str]:
+    try:
+        date.fromisoformat(str(value))
+    except ValueError:
+        return f"不是合法的日期: {value!r}"
+    return None
+
+
+def check_time(value, params) -> Optional[str]:
+    try:
+        time.fromisoformat(str(value))
+    except ValueError:
+        return f"不是合法的时刻: {value!r}"
+    return None
+
+
+def check_json(value, params) -> Optional[str]:
+    return None
+
+
+CHECKERS = {
+    'string': check_string,
+    'integer': check_integer,
+    'decimal': check_decimal,
+    'boolean': check_boolean,
+    'uuid': check_uuid,
+    'timestamp': check_timestamp,
+    'date': check_date,
+    'time': check_time,
+    'json': check_json,
+}
+
+# PostgreSQL类型（大写，含常用别名）到检查类型；不在表中的类型在编译时报错，不会被静默跳过
+SQL_TYPES = {
+    'VARCHAR': 'string',
+    'CHARACTER VARYING': 'string',
+    'CHAR': 'string',
+    'CHARACTER': 'string',
+    'TEXT': 'string',
+    'CITEXT': 'string',
+    'SMALLINT': 'integer',
+    'INTEGER': 'integer',
+    'INT': 'integer',
+    'INT2': 'integer',
+    'INT4': 'integer',
+    'INT8': 'integer',
+    'BIGINT': 'integer',
+    'SMALLSERIAL': 'integer',
+    'SERIAL': 'integer',
+    'BIGSERIAL': 'integer',
+    'DECIMAL': 'decimal',
+    'NUMERIC': 'decimal',
+    'REAL': 'decimal',
+    'FLOAT': 'decimal',
+    'FLOAT4': 'decimal',
+    'FLOAT8': 'decimal',
+    'DOUBLE PRECISION': 'decimal',
+    'BOOLEAN': 'boolean',
+    'BOOL': 'boolean',
+    'UUID': 'uuid',
+    'TIMESTAMP': 'timestamp',
+    'TIMESTAMPTZ': 'timestamp',
+    'DATE': 'date',
+    'TIME': 'time',
+    'TIMETZ': 'time',
+    'JSON': 'json',
+    'JSONB': 'json',
+}
+_SIZED_STRING_TYPES = {'VARCHAR', 'CHARACTER VARYING', 'CHAR', 'CHARACTER'}
+
+
+class SchemaValidator:
+    """由SQL建表语句编译出的字段校验规则，规则只含普通数据，可传给子进程"""
+
+    def __init__(self, schema_file: str = SCHEMA_FILE, tables: Tuple[str, ...] = SCHEMA_TABLES):
+        with open(schema_file, 'r', encoding='utf-8') as f:
+            sql = f.read()
+
+        self.tables: Dict[str, List[tuple]] = {}
+        self.columns: Dict[str, set] = {}
+        for table, body in _TABLE_RE.findall(sql):
+            if table in tables:
+                self.tables[table] = self.compile_table(table, body)
+                self.columns[table] = {rule[0] for rule in self.tables[table]}
+
+        missing = set(tables) - set(self.tables)
+        if missing:
+            raise ValueError(f"表结构文件中缺少: {', '.join(sorted(missing))}")
+
+    def compile_table(self, table: str, body: str) -> List[tuple]:
+        """编译单张表：(列名, 是否必填, 检查类型, 参数)；遇到不支持的列类型抛出ValueError"""
+        rules = []
+        for line in body.split('\n'):
+            code, _, comment = line.partition('--')
+            code = code.strip().rstrip(',')
+            match = _COLUMN_RE.match(code)
+            if not match or match.group(1).upper() in _CONSTRAINT_WORDS:
+                continue
+
+            column, sql_type, size, array, rest = match.groups()
+            sql_type = ' '.join(sql_type.upper().split())
+            kind = SQL_TYPES.get(sql_type)
+            if kind is None:
+                raise ValueError(f"{table}.{column} 的列类型 {sql_type} 不受支持")
+
+            params: Dict[str, Any] = {}
+            if array:
+                params['array'] = True
+            if sql_type in _SIZED_STRING_TYPES and size:
+                params['max_length'] = int(size)
+            elif sql_type in ('DECIMAL', 'NUMERIC') and size:
+                precision, _, scale = size.partition(',')
+                params.update(precision=int(precision), scale=int(scale or 0))
+
+            # 形如 "-- common, uncommon, rare" 的注释视为枚举取值
+            choices = [c.strip() for c in comment.split(',')]
+            if kind == 'string' and len(choices) > 1 and all(re.fullmatch(r'[a-z_]+', c) for c in choices):
+                params['choices'] = choices
+
+            rest = rest.upper()
+            required = 'NOT NULL' in rest and 'DEFAULT' not in rest and 'PRIMARY KEY' not in rest
+            rules.append((column, required, kind, params))
+        return rules
+
+    def validate(self, table: str, record: Dict) -> List[Dict[str, str]]:
+        """校验一条待上传记录，返回全部字段错误（不在首个错误处中断），表中不存在的列同样报错"""
+        errors = [
+            {'field': column, 'error': f'{table} 表中不存在该列'}
+            for column in record if column not in self.columns[table]
+        ]
+        for column, required, kind, params in self.tables[table]:
+            value = record.get(column)
+            if value is None:
+                if required:
+                    errors.append({'field': column, 'error': '缺少必填字段'})
+                continue
+            message = check_value(kind, value, params)
+            if message:
+                errors.append({'field': column, 'error': message})
+        return errors
+
+
+def check_value(kind: str, value: Any, params: Dict[str, Any]) -> Optional[str]:
+    """按检查类型校验单个值；数组列逐个校验元素"""
+    if not params.get('array'):
+        return CHECKERS[kind](value, params)
+    if not isinstance(value, list):
+        return f"应为数组，实际为 {type(value).__name__}"
+    for position, item in enumerate(value):
+        if item is None:
+            continue
+        message = CHECKERS[kind](item, params)
+        if message:
+            return f"第 {position} 个元素{message}"
+    return None
+
+
+def missing_inputs(table: str, record: Dict) -> List[Dict[str, str]]:
+    """转换前检查输入记录是否含有转换逻辑必需的字段"""
+    return [
+        {'field': field, 'error': '缺少转换所需字段'}
+        for field in TRANSFORM_INPUTS[table] if record.get(field) is None
+    ]
+
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(validator: SchemaValidator, series_mapping: Dict[str, str], invalid_series: set):
+    """子进程初始化：接收父进程编译好的校验器，每个进程只接收一次"""
+    _worker_state['validator'] = validator
+    _worker_state['series_mapping'] = series_mapping
+    _worker_state['invalid_series'] = invalid_series
+    _worker_state['importer'] = LabubuDataImporter('', '')
+
+
+def _process_models(chunk: List[Tuple[int, Dict]]) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+    """转换一组模型及其子表记录并校验转换结果，返回(表名 -> 可上传记录, 错误列表)
+
+    模型与其子表记录全部通过校验才会写入批次，避免上传后只剩一部分
+    """
+    validator = _worker_state['validator']
+    series_mapping = _worker_state['series_mapping']
+    invalid_series = _worker_state['invalid_series']
+    importer = _worker_state['importer']
+
+    records: Dict[str, List[Dict]] = {table: [] for table in SCHEMA_TABLES if table != 'labubu_series'}
+    errors = []
+    for index, model in chunk:
+        key = model.get('model_number') or model.get('name') or f'#{index}'
+        problems = missing_inputs('labubu_models', model)
+
+        series_name = model.get('series_name')
+        series_id = series_mapping.get(series_name)
+        if series_name in invalid_series:
+            # 系列本身未通过校验时仍转换模型，使模型自身的问题也出现在报告中
+            problems.append({'field': 'series_name', 'error': f"所属系列未通过校验: {series_name}"})
+            series_id = importer.series_id_for(series_name)
+        elif series_name and not series_id:
+            problems.append({'field': 'series_name', 'error': f"找不到对应系列: {series_name}"})
+
+        if series_id and not any(p['error'] == '缺少转换所需字段' for p in problems):
+            try:
+                record = importer.build_model_record(model, series_id)
+                children = importer.build_model_children(model, record['id'])
+            except Exception as e:
+                problems.append({'field': None, 'error': f"转换失败: {transform_error(e)}"})
+            else:
+                problems.extend(validator.validate('labubu_models', record))
+                for table, rows in children.items():
+                    for row in rows:
+                        problems.extend({'table': table, **p} for p in validator.validate(table, row))
+                if not problems:
+                    records['labubu_models'].append(record)
+                    for table, rows in children.items():
+                        records[table].extend(rows)
+
+        errors.extend({'table': 'labubu_models', 'index': index, 'key': key, **p} for p in problems)
+    return records, errors
+
+
+def chunked(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def write_json(path: str, payload: Any):
+    # 各分片共用同一输出目录时会同时写series.json，原子替换避免读到写了一半的文件
+    atomic_write(path, json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def validate_and_transform(data_file: str = 'sample_data.json',
+                           schema_file: str = SCHEMA_FILE,
+                           out_dir: Optional[str] = None,
+                           shard: Optional[tuple] = None,
+                           workers: Optional[int] = None,
+                           batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """离线转换并校验全部记录；指定out_dir时写出上传批次与错误报告
+
+    数据文件无法加载时返回None；表结构文件缺失或不完整时抛出OSError / ValueError
+    """
+    importer = LabubuDataImporter('', '')
+    data = importer.load_sample_data(data_file)
+    if not data:
+        return None
+
+    validator = SchemaValidator(schema_file)
+    errors: List[Dict] = []
+
+    # 系列数量少，直接在主进程处理；ID确定，与分片导入一致
+    series_records = []
+    series_mapping = {}
+    invalid_series = set()
+    for index, series in enumerate(data.get('series', [])):
+        key = series.get('name') or f'#{index}'
+        problems = missing_inputs('labubu_series', series)
+        if not problems:
+            try:
+                record = importer.build_series_record(series)
+            except Exception as e:
+                problems = [{'field': None, 'error': f"转换失败: {transform_error(e)}"}]
+            else:
+                problems = validator.validate('labubu_series', record)
+        if problems:
+            errors.extend({'table': 'labubu_series', 'index': index, 'key': key, **p} for p in problems)
+            invalid_series.add(series.get('name'))
+            continue
+        series_records.append(record)
+        series_mapping[series['name']] = record['id']
+
+    # 先按完整输入编号再分片，错误报告中的index对应数据文件中的位置
+    all_models = data.get('models', [])
+    selected = {id(model) for model in select_shard(all_models, shard)}
+    indexed = [(index, model) for index, model in enumerate(all_models) if id(model) in selected]
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(indexed, max(1, len(indexed) // (workers * 4) or 1))
+
+    table_records: Dict[str, List[Dict]] = {'labubu_series': series_records}
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(validator, series_mapping, invalid_series)
+        results = [_process_models(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(validator, series_mapping, invalid_series)) as pool:
+            results = list(pool.map(_process_models, chunks))
+    for records, chunk_errors in results:
+        for table, rows in records.items():
+            table_records.setdefault(table, []).extend(rows)
+        errors.extend(chunk_errors)
+    counts = {table: len(table_records.get(table, [])) for table in SCHEMA_TABLES}
+
+    files = []
+    if out_dir:
+        # 系列与分片无关、ID确定，各分片写出相同的series.json；其余文件名带分片编号避免互相覆盖
+        suffix = f'_s{shard[0]}of{shard[1]}' if shard else ''
+        os.makedirs(out_dir, exist_ok=True)
+        write_json(os.path.join(out_dir, 'series.json'), series_records)
+        files.append('series.json')
+        for prefix, table in BATCH_TABLES[1:]:
+            for number, batch in enumerate(chunked(table_records.get(table, []), batch_size)):
+                name = f'{prefix}{suffix}_{number:04d}.json'
+                write_json(os.path.join(out_dir, name), batch)
+                files.append(name)
+        write_json(os.path.join(out_dir, f'report{suffix}.json'), {
+            'generated_at': datetime.now().isoformat(),
+            'data_file': data_file,
+            'shard': list(shard) if shard else None,
+            'records': counts,
+            'errors': errors,
+            'files': files,
+        })
+
+    return {'series': counts['labubu_series'], 'models': counts['labubu_models'],
+            'input_models': len(indexed), 'records': counts, 'errors': errors, 'files': files}
+
+
+def print_summary(result: Dict[str, Any], out_dir: Optional[str] = None):
+    print(f"✅ 系列: {result['series']} 条可上传")
+    print(f"✅ 模型: {result['models']}/{result.get('input_models', result['models'])} 条可上传")
+    records = result.get('records', {})
+    print(f"✅ 参考图片: {records.get('labubu_reference_images', 0)} 条，"
+          f"视觉特征: {records.get('labubu_visual_features', 0)} 条可上传")
+
+    errors = result['errors']
+    if errors:
+        print(f"\n⚠️ 发现 {len(errors)} 个问题:")
+        for error in errors[:MAX_PRINTED_ERRORS]:
+            field = f" [{error['field']}]" if error.get('field') else ''
+            print(f"   {error['table']} {error['key']}{field}: {error['error']}")
+        if len(errors) > MAX_PRINTED_ERRORS:
+            hint = '，完整列表见报告文件' if out_dir else ''
+            print(f"   ... 其余 {len(errors) - MAX_PRINTED_ERRORS} 个问题未显示{hint}")
+    else:
+        print("\n✅ 全部记录通过表结构校验")
+
+    if out_dir:
+        print(f"\n📦 上传批次已写入: {out_dir} ({len(result['files'])} 个文件)")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Labubu模型搜索索引
+基于n-gram倒排索引对name / name_cn / name_en / model_number / series_name及标签做模糊检索，
+支持中文、拼音（安装pypinyin时）与英文分词，索引可持久化到磁盘并增量更新
+"""
+
+import hashlib
+import json
+import math
+import re
+import sys
+from typing import Dict, List, Any, Optional
+
+from file_utils import atomic_write
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 未安装时仅使用汉字n-gram
+    lazy_pinyin = None
+
+INDEX_VERSION = 2
+TEXT_FIELDS = ('name', 'name_cn', 'name_en', 'model_number', 'series_name')
+TAG_WEIGHT = 2.0
+EXACT_WEIGHT = 3.0
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_CJK_RE = re.compile(r'[一-鿿]+')
+_tag_extractor = None
+
+
+def extract_tags(model: Dict) -> List[str]:
+    """复用导入脚本的标签提取逻辑；数据库记录已带tags时直接使用"""
+    global _tag_extractor
+    if model.get('tags'):
+        return list(model['tags'])
+    if 'rarity_level' not in model:
+        return []
+    if _tag_extractor is None:
+        from import_labubu_data import LabubuDataImporter
+        _tag_extractor = LabubuDataImporter('', '')
+    return _tag_extractor.extract_tags(model)
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为检索词：英文/数字整词、汉字、拼音"""
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        tokens.append(run)
+        if lazy_pinyin is not None:
+            syllables = lazy_pinyin(run)
+            tokens.append(''.join(syllables))
+            tokens.append(''.join(s[0] for s in syllables if s))
+    return tokens
+
+
+def ngrams(token: str) -> List[str]:
+    """英文/拼音取首尾补位的三元组，汉字取单字与双字"""
+    if _CJK_RE.fullmatch(token):
+        grams = list(token)
+        grams.extend(token[i:i + 2] for i in range(len(token) - 1))
+        return grams
+    padded = f' {token} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class ModelSearchIndex:
+    def __init__(self, index_path: str = 'labubu_search_index.json'):
+        self.index_path = index_path
+        self.source_hash: Optional[str] = None
+        self.docs: List[Optional[Dict[str, Any]]] = []
+        self.keys: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.term_postings: Dict[str, List[int]] = {}
+        self.tag_postings: Dict[str, List[int]] = {}
+
+    def model_key(self, model: Dict) -> Optional[str]:
+        """模型唯一键：优先model_number，其次数据库id"""
+        return model.get('model_number') or model.get('id')
+
+    def upsert(self, model: Dict) -> bool:
+        """新增或更新单个模型，只改动该模型自身的倒排项；更新时复用原文档编号"""
+        key = self.model_key(model)
+        if not key:
+            return False
+
+        doc_id = self.keys.get(key)
+        if doc_id is None:
+            doc_id = len(self.docs)
+            self.docs.append(None)
+        else:
+            self.unindex(doc_id)
+
+        texts = [str(model[field]) for field in TEXT_FIELDS if model.get(field)]
+        tags = extract_tags(model)
+        terms = set()
+        grams: Dict[str, int] = {}
+        for token in tokenize(' '.join(texts)):
+            terms.add(token)
+            for gram in ngrams(token):
+                grams[gram] = grams.get(gram, 0) + 1
+
+        self.docs[doc_id] = {
+            'key': key,
+            'name': model.get('name'),
+            'name_en': model.get('name_en'),
+            'name_cn': model.get('name_cn'),
+            'model_number': model.get('model_number'),
+            'tags': tags,
+            'terms': sorted(terms),
+            'grams': grams,
+            'gram_total': sum(grams.values()),
+        }
+        self.keys[key] = doc_id
+        self.index_doc(doc_id)
+        return True
+
+    def index_doc(self, doc_id: int):
+        """把文档写入n-gram、整词与标签倒排表"""
+        doc = self.docs[doc_id]
+        for gram, count in doc['grams'].items():
+            self.postings.setdefault(gram, {})[doc_id] = count
+        for term in doc['terms']:
+            self.term_postings.setdefault(term, []).append(doc_id)
+        for tag in set(tag.lower() for tag in doc['tags']):
+            self.tag_postings.setdefault(tag, []).append(doc_id)
+
+    def unindex(self, doc_id: int):
+        """从全部倒排表中移除文档，文档位置本身保留"""
+        doc = self.docs[doc_id]
+        for gram in doc['grams']:
+            postings = self.postings.get(gram)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[gram]
+        for table, values in ((self.term_postings, doc['terms']),
+                              (self.tag_postings, set(tag.lower() for tag in doc['tags']))):
+            for value in values:
+                postings = table.get(value)
+                if postings is not None and doc_id in postings:
+                    postings.remove(doc_id)
+                    if not postings:
+                        del table[value]
+
+    def remove(self, key: str) -> bool:
+        """删除模型的全部倒排项，文档位置置空，保存时压缩"""
+        doc_id = self.keys.pop(key, None)
+        if doc_id is None:
+            return False
+        self.unindex(doc_id)
+        self.docs[doc_id] = None
+        return True
+
+    def compact(self):
+        """去掉已删除的文档位置并重新编号"""
+        if all(doc is not None for doc in self.docs):
+            return
+        docs = [doc for doc in self.docs if doc is not None]
+        self.docs, self.keys = docs, {}
+        self.postings, self.term_postings, self.tag_postings = {}, {}, {}
+        for doc_id, doc in enumerate(docs):
+            self.keys[doc['key']] = doc_id
+            self.index_doc(doc_id)
+
+    def build(self, models_data: List[Dict]) -> int:
+        """从模型列表全量构建索引"""
+        self.docs, self.keys = [], {}
+        self.postings, self.term_postings, self.tag_postings = {}, {}, {}
+        return sum(1 for model in models_data if self.upsert(model))
+
+    def idf(self, token: str) -> float:
+        """整词的逆文档频率，出现在全部模型中的词（如labubu）权重为0"""
+        total = len(self.keys)
+        return math.log((total + 1) / (len(self.term_postings.get(token, ())) + 1))
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """排序后的模糊检索：n-gram Dice相似度 + 按IDF加权的整词命中 + 标签命中"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        query_grams: Dict[str, int] = {}
+        for token in tokens:
+            for gram in ngrams(token):
+                query_grams[gram] = query_grams.get(gram, 0) + 1
+        query_total = sum(query_grams.values())
+
+        overlap: Dict[int, int] = {}
+        for gram, q_count in query_grams.items():
+            for doc_id, d_count in self.postings.get(gram, {}).items():
+                overlap[doc_id] = overlap.get(doc_id, 0) + min(q_count, d_count)
+
+        scores: Dict[int, float] = {}
+        for doc_id, shared in overlap.items():
+            doc = self.docs[doc_id]
+            # 以查询长度为主的Dice系数，避免长名称被过度惩罚
+            scores[doc_id] = 2.0 * shared / (query_total + min(doc['gram_total'], 2 * query_total))
+
+        for token in tokens:
+            for doc_id in self.tag_postings.get(token, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + TAG_WEIGHT
+
+        # 整词命中按查询词IDF占比加权，常见词几乎不加分；全部为常见词时按命中比例加权
+        weights = {token: self.idf(token) for token in tokens}
+        weight_total = sum(weights.values())
+        if weight_total == 0:
+            weights = {token: 1.0 for token in tokens}
+            weight_total = float(len(tokens))
+        for token in tokens:
+            for doc_id in self.term_postings.get(token, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + EXACT_WEIGHT * weights[token] / weight_total
+
+        ranked = sorted(
+            ((score, doc_id) for doc_id, score in scores.items() if score >= min_score),
+            key=lambda item: (-item[0], item[1])
+        )
+        results = []
+        for score, doc_id in ranked[:limit]:
+            doc = self.docs[doc_id]
+            results.append({
+                'key': doc['key'],
+                'name': doc['name'],
+                'name_en': doc['name_en'],
+                'name_cn': doc['name_cn'],
+                'model_number': doc['model_number'],
+                'tags': doc['tags'],
+                'score': round(score, 4),
+            })
+        return results
+
+    def save(self, file_path: Optional[str] = None):
+        """压缩后序列化索引到磁盘（临时文件+os.replace，读者不会看到写了一半的文件）"""
+        self.compact()
+        payload = {
+            'version': INDEX_VERSION,
+            'pinyin': lazy_pinyin is not None,
+            'source_hash': self.source_hash,
+            'docs': self.docs,
+        }
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        atomic_write(file_path or self.index_path, data)
+
+    def load(self, file_path: Optional[str] = None) -> bool:
+        """从磁盘加载索引；版本或分词配置不一致时返回False，需要重建"""
+        try:
+            with open(file_path or self.index_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ 读取搜索索引失败，将重新构建: {e}")
+            return False
+
+        if payload.get('version') != INDEX_VERSION or payload.get('pinyin') != (lazy_pinyin is not None):
+            return False
+        self.source_hash = payload.get('source_hash')
+        self.docs, self.keys = [], {}
+        self.postings, self.term_postings, self.tag_postings = {}, {}, {}
+        for doc in payload['docs']:
+            self.keys[doc['key']] = len(self.docs)
+            self.docs.append(doc)
+            self.index_doc(len(self.docs) - 1)
+        return True
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def load_or_build(data_file: str = 'sample_data.json',
+                  index_path: str = 'labubu_search_index.json') -> ModelSearchIndex:
+    """优先加载磁盘索引；不存在或sample_data.json已变化时重新构建并保存"""
+    index = ModelSearchIndex(index_path)
+    source_hash = file_hash(data_file)
+    if index.load() and (source_hash is None or index.source_hash == source_hash):
+        return index
+
+    try:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"❌ 加载数据文件失败: {e}")
+        return index
+
+    count = index.build(data.get('models', []))
+    index.source_hash = source_hash
+    index.save()
+    print(f"✅ 已构建搜索索引: {count} 个模型 -> {index_path}")
+    return index
+
+
+def main():
+    """主函数"""
+    print("=== Labubu模型搜索工具 ===\n")
+
+    if len(sys.argv) < 2:
+        print("用法: python labubu_search_index.py <关键词>")
+        return
+
+    index = load_or_build()
+    query = ' '.join(sys.argv[1:])
+    results = index.search(query)
+    if not results:
+        print(f"🔍 未找到与 \"{query}\" 匹配的模型")
+        return
+
+    print(f"🔍 \"{query}\" 的检索结果:")
+    for item in results:
+        display = item['name_cn'] or item['name']
+        print(f"   {item['score']:.2f}  {item['key']}  {display}  {item['name_en'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
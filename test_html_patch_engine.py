@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+html_patch_engine 行为测试
+固定单遍替换语义：替换结果不再被扫描、同一位置前面的规则优先、unless标记跳过规则
+运行: python -m pytest -q test_html_patch_engine.py
+"""
+
+from html_patch_engine import PatchEngine, PatchRule
+
+
+def test_replacements_are_not_rescanned():
+    engine = PatchEngine([
+        PatchRule('a_to_b', 'foo', 'bar'),
+        PatchRule('b_to_c', 'bar', 'baz'),
+    ])
+    content, counts = engine.apply('foo bar')
+    assert content == 'bar baz'
+    assert counts == {'a_to_b': 1, 'b_to_c': 1}
+
+
+def test_earlier_rule_wins_on_overlap():
+    engine = PatchEngine([
+        PatchRule('short', 'ab', '1'),
+        PatchRule('long', 'abc', '2'),
+        PatchRule('shifted', 'bcd', '3'),
+    ])
+    content, counts = engine.apply('abcd')
+    assert content == '1cd'
+    assert counts == {'short': 1, 'long': 0, 'shifted': 0}
+
+
+def test_unless_marker_skips_rule():
+    rule = PatchRule('inject', '<main>', '<script>fix()</script><main>', unless='fix()')
+    engine = PatchEngine([rule, PatchRule('prod', 'vue.global.js', 'vue.global.prod.js')])
+
+    once, _ = engine.apply('<main> vue.global.js')
+    assert once == '<script>fix()</script><main> vue.global.prod.js'
+
+    twice, counts = engine.apply(once)
+    assert twice == once
+    assert counts == {'inject': 0, 'prod': 0}
+
+
+def test_regex_flags_are_scoped_to_rule():
+    engine = PatchEngine([
+        PatchRule('drop_block', r'start.*?end\n?', '', literal=False, flags='s'),
+        PatchRule('dot_literal', 'a.b', 'X'),
+    ])
+    content, _ = engine.apply('start\nmiddle\nend\na.b axb')
+    assert content == 'X axb'
+
+
+def test_run_patches_once_then_skips(tmp_path):
+    target = tmp_path / 'dashboard.html'
+    target.write_text('<script src="vue.global.js"></script>', encoding='utf-8')
+    engine = PatchEngine([PatchRule('prod', 'vue.global.js', 'vue.global.prod.js')],
+                         state_file=str(tmp_path / 'state.json'))
+
+    first = engine.run([str(target)], workers=1)
+    assert [r['status'] for r in first] == ['patched']
+    assert target.read_text(encoding='utf-8') == '<script src="vue.global.prod.js"></script>'
+
+    second = engine.run([str(target)], workers=1)
+    assert [r['status'] for r in second] == ['skipped']
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('.tmp-')] == []
+
+
+def test_undecodable_file_is_reported_and_others_still_patched(tmp_path):
+    bad = tmp_path / 'bad.html'
+    bad.write_bytes(b'\xff\xfe<script src="vue.global.js">')
+    good = tmp_path / 'good.html'
+    good.write_text('<script src="vue.global.js"></script>', encoding='utf-8')
+    state_file = tmp_path / 'state.json'
+    engine = PatchEngine([PatchRule('prod', 'vue.global.js', 'vue.global.prod.js')], state_file=str(state_file))
+
+    results = {r['path']: r for r in engine.run([str(bad), str(good)], workers=2)}
+    assert results[str(bad)]['status'] == 'error'
+    assert results[str(good)]['status'] == 'patched'
+    assert bad.read_bytes() == b'\xff\xfe<script src="vue.global.js">'
+    assert state_file.exists()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+labubu_price_history 行为测试
+固定无效价格跳过、按币种/成色分段、逐日滚动统计、波动率与指纹增量刷新语义
+运行: python -m pytest -q test_labubu_price_history.py
+"""
+
+import json
+
+from labubu_price_history import PriceHistoryStore
+
+MODELS = [{
+    'model_number': 'LB-CL-001', 'series_name': '经典系列', 'rarity_level': 'common',
+    'estimated_price_min': 80.0, 'estimated_price_max': 120.0,
+}]
+
+
+def point(price, day, condition='new', currency='CNY'):
+    return {'model_number': 'LB-CL-001', 'price': price, 'currency': currency,
+            'condition': condition, 'date': f'2024-12-{day:02d}'}
+
+
+def make_store(points, window_days=3):
+    store = PriceHistoryStore(window_days=window_days)
+    store.load_models(MODELS)
+    store.add_points(points)
+    store.refresh_summary()
+    return store
+
+
+def test_invalid_prices_are_skipped():
+    store = PriceHistoryStore()
+    added = store.add_points([point('abc', 1), point(None, 2), point('nan', 3), point('100', 4)])
+    assert added == 1
+    assert list(store.series[('LB-CL-001', 'CNY:new')].prices) == [100.0]
+
+
+def test_series_are_split_by_currency_and_condition():
+    store = make_store([point(120, 1), point(95, 2, condition='used'), point(15, 3, currency='USD')])
+    segments = store.summary['LB-CL-001']
+    assert sorted(segments) == ['CNY:new', 'CNY:used', 'USD:new']
+    assert segments['CNY:used']['latest_price'] == 95
+    assert segments['CNY:new']['price_index'] == 1.2
+    assert segments['USD:new']['price_index'] is None
+
+
+def test_rolling_values_per_day():
+    store = make_store([point(10, 4), point(30, 1), point(20, 2), point(40, 4)])
+    rolling = store.summary['LB-CL-001']['CNY:new']['rolling']
+    assert rolling['window_days'] == 3
+    assert rolling['points'] == [
+        {'date': '2024-12-01', 'count': 1, 'min': 30, 'max': 30, 'median': 30},
+        {'date': '2024-12-02', 'count': 2, 'min': 20, 'max': 30, 'median': 25},
+        {'date': '2024-12-04', 'count': 3, 'min': 10, 'max': 40, 'median': 20},
+    ]
+
+
+def test_volatility_needs_two_returns():
+    single = make_store([point(100, 1), point(80, 2)])
+    assert single.summary['LB-CL-001']['CNY:new']['volatility'] is None
+    assert single.group_index('series_name')['经典系列']['CNY:new']['volatility'] is None
+
+    moving = make_store([point(100, 1), point(80, 2), point(100, 3)])
+    assert moving.summary['LB-CL-001']['CNY:new']['volatility'] > 0
+
+
+def test_refresh_recomputes_only_changed_segments():
+    store = make_store([point(100, 1), point(90, 2, condition='used')])
+    store.add_points([point(120, 3)])
+    assert store.refresh_summary() == ['LB-CL-001']
+    assert store.summary['LB-CL-001']['CNY:new']['latest_price'] == 120
+    assert store.refresh_summary() == []
+
+    del store.series[('LB-CL-001', 'CNY:used')]
+    store.refresh_summary()
+    assert list(store.summary['LB-CL-001']) == ['CNY:new']
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / 'summary.json')
+    store = make_store([point(100, 1), point(110, 2)])
+    store.save_summary(path)
+    assert [p.name for p in tmp_path.iterdir()] == ['summary.json']
+
+    reloaded = PriceHistoryStore(window_days=3)
+    assert reloaded.load_summary(path)
+    assert reloaded.summary == json.loads(json.dumps(store.summary))
+    assert not PriceHistoryStore(window_days=30).load_summary(path)
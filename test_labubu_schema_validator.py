@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+labubu_schema_validator 行为测试
+固定建表语句解析（类型别名、数组、大小写）、逐字段校验语义，
+以及仓库自带的sample_data.json能按supabase_database_setup.sql完整转换并写出批次
+运行: python -m pytest -q test_labubu_schema_validator.py
+"""
+
+import copy
+import json
+import os
+import sys
+import types
+
+import pytest
+
+from import_labubu_data import LabubuDataImporter
+from labubu_schema_validator import SchemaValidator, validate_and_transform
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DATA = os.path.join(ROOT, 'sample_data.json')
+REPO_SCHEMA = os.path.join(ROOT, 'supabase_database_setup.sql')
+
+SCHEMA = """
+create table if not exists public.items (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    name varchar(10) NOT NULL,
+    kind VARCHAR(20), -- common, rare
+    price DECIMAL(5,2),
+    weight numeric,
+    stock BIGINT,
+    release_date DATE,
+    tags TEXT[],
+    sizes INTEGER[],
+    meta JSONB,
+    seen_at TIMESTAMPTZ,
+    score DOUBLE PRECISION,
+    total INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (name)
+);
+"""
+
+
+def compile_schema(tmp_path, sql=SCHEMA, tables=('items',)):
+    path = tmp_path / 'schema.sql'
+    path.write_text(sql, encoding='utf-8')
+    return SchemaValidator(str(path), tables=tables)
+
+
+def errors_for(validator, record):
+    return {error['field']: error['error'] for error in validator.validate('items', record)}
+
+
+def test_compiles_all_columns_case_insensitively(tmp_path):
+    validator = compile_schema(tmp_path)
+    assert validator.columns['items'] == {
+        'id', 'name', 'kind', 'price', 'weight', 'stock', 'release_date', 'tags',
+        'sizes', 'meta', 'seen_at', 'score', 'total',
+    }
+
+
+def test_valid_record_passes(tmp_path):
+    validator = compile_schema(tmp_path)
+    record = {
+        'name': 'pink', 'kind': 'rare', 'price': 999.99, 'weight': 12345.678, 'stock': 2 ** 40,
+        'release_date': '2019-03-15', 'tags': ['粉色', 'common'], 'sizes': [1, 2], 'meta': {'a': [1]},
+        'seen_at': '2024-12-01T10:00:00Z', 'score': 0.5,
+    }
+    assert errors_for(validator, record) == {}
+
+
+def test_reports_every_field_error(tmp_path):
+    validator = compile_schema(tmp_path)
+    errors = errors_for(validator, {
+        'kind': 'legendary', 'price': 1000, 'release_date': '2019-13-01',
+        'tags': 'pink', 'sizes': [1, 'x'], 'theme': 'classic',
+    })
+    assert set(errors) == {'name', 'kind', 'price', 'release_date', 'tags', 'sizes', 'theme'}
+    assert errors['name'] == '缺少必填字段'
+    assert 'common, rare' in errors['kind']
+    assert 'DECIMAL(5,2)' in errors['price']
+    assert '日期' in errors['release_date']
+    assert '数组' in errors['tags']
+    assert errors['sizes'].startswith('第 1 个元素')
+    assert errors['theme'] == 'items 表中不存在该列'
+
+
+def test_varchar_length_limit(tmp_path):
+    validator = compile_schema(tmp_path)
+    assert 'name' in errors_for(validator, {'name': 'x' * 11})
+
+
+def test_unknown_column_type_is_rejected(tmp_path):
+    sql = "CREATE TABLE items (\n    id UUID PRIMARY KEY,\n    embedding VECTOR(512)\n);"
+    with pytest.raises(ValueError, match='VECTOR'):
+        compile_schema(tmp_path, sql)
+
+
+def test_missing_table_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='other'):
+        compile_schema(tmp_path, tables=('items', 'other'))
+
+
+def test_sample_data_passes_repo_schema(tmp_path):
+    result = validate_and_transform(SAMPLE_DATA, schema_file=REPO_SCHEMA, out_dir=str(tmp_path), workers=1)
+    assert result['errors'] == []
+    assert result['records'] == {
+        'labubu_series': 4, 'labubu_models': 6,
+        'labubu_reference_images': 14, 'labubu_visual_features': 6,
+    }
+    assert sorted(result['files']) == [
+        'models_0000.json', 'reference_images_0000.json', 'series.json', 'visual_features_0000.json',
+    ]
+    models = json.loads((tmp_path / 'models_0000.json').read_text(encoding='utf-8'))
+    assert {m['model_number'] for m in models} >= {'LB-CL-001', 'LB-AR-001'}
+
+
+def write_data(tmp_path, mutate):
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    mutate(data)
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_bad_models_are_reported_and_rest_batched(tmp_path):
+    def mutate(data):
+        data['models'][1]['rarity_level'] = 'legendary'
+        data['models'][2]['reference_images'][0].pop('url')
+        data['models'][3]['visual_features']['height_cm'] = 1000
+        data['series'][0]['name_en'] = 'x' * 300
+
+    result = validate_and_transform(write_data(tmp_path, mutate), schema_file=REPO_SCHEMA, workers=1)
+    errors = {(e['table'], e['index'], e['field']) for e in result['errors']}
+    assert ('labubu_series', 0, 'name_en') in errors
+    assert ('labubu_models', 1, 'rarity_level') in errors
+    assert ('labubu_models', 2, None) in errors
+    assert ('labubu_visual_features', 3, 'height_cm') in errors
+    # 前三个模型属于未通过校验的经典系列，第四个视觉特征超出范围，其余模型不受影响
+    assert result['series'] == 3
+    assert result['models'] == 2
+
+
+def test_importer_skips_untransformable_model_and_continues(monkeypatch):
+    posted = []
+    fake_requests = types.SimpleNamespace(
+        post=lambda url, headers=None, json=None: posted.append(url) or types.SimpleNamespace(status_code=201, text='')
+    )
+    monkeypatch.setitem(sys.modules, 'requests', fake_requests)
+
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        models = json.load(f)['models'][:2]
+    broken = copy.deepcopy(models[0])
+    broken['reference_images'] = [{'type': 'official_front'}]
+
+    importer = LabubuDataImporter('http://localhost', 'key')
+    series_id = importer.series_id_for('经典系列')
+    failed = importer.import_models([broken, models[1]], {'经典系列': series_id})
+    assert failed == 1
+    assert posted.count('http://localhost/rest/v1/labubu_models') == 1
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+labubu_search_index 行为测试
+固定分词、文档位置复用与压缩、IDF加权的整词命中以及保存/加载往返
+运行: python -m pytest -q test_labubu_search_index.py
+"""
+
+import json
+
+import pytest
+
+import labubu_search_index
+from labubu_search_index import ModelSearchIndex, EXACT_WEIGHT, INDEX_VERSION, ngrams, tokenize
+
+MODELS = [
+    {'model_number': 'LB-CL-001', 'name': '经典粉色Labubu', 'name_en': 'Classic Pink Labubu', 'tags': ['粉色', 'common']},
+    {'model_number': 'LB-CL-002', 'name': '经典蓝色Labubu', 'name_en': 'Classic Blue Labubu', 'tags': ['蓝色', 'common']},
+    {'model_number': 'LB-DR-001', 'name': '梦幻独角兽Labubu', 'name_en': 'Dream Unicorn Labubu', 'tags': ['rare']},
+]
+
+
+@pytest.fixture(autouse=True)
+def no_pinyin(monkeypatch):
+    # 拼音为可选依赖，固定为未安装以保证分词结果确定
+    monkeypatch.setattr(labubu_search_index, 'lazy_pinyin', None)
+
+
+def build_index(tmp_path, models=MODELS):
+    index = ModelSearchIndex(str(tmp_path / 'index.json'))
+    index.build(models)
+    return index
+
+
+def test_tokenize_splits_words_and_cjk_runs():
+    assert tokenize('Classic Pink-Labubu 经典粉色 LB-CL-001') == [
+        'classic', 'pink', 'labubu', 'lb', 'cl', '001', '经典粉色'
+    ]
+    assert ngrams('ab') == [' ab', 'ab ']
+    assert ngrams('经典') == ['经', '典', '经典']
+
+
+def test_upsert_reuses_doc_slot(tmp_path):
+    index = build_index(tmp_path)
+    for name_en in ('Classic Rose Labubu', 'Classic Red Labubu'):
+        index.upsert({**MODELS[0], 'name_en': name_en})
+
+    assert len(index.docs) == len(MODELS)
+    assert index.keys['LB-CL-001'] == 0
+    assert 'pink' not in index.term_postings
+    assert [r['key'] for r in index.search('red', min_score=1.0)] == ['LB-CL-001']
+
+
+def test_remove_and_compact_renumber_docs(tmp_path):
+    index = build_index(tmp_path)
+    assert index.remove('LB-CL-001')
+    assert not index.remove('LB-CL-001')
+    assert all(0 not in postings for postings in index.postings.values())
+
+    index.compact()
+    assert len(index.docs) == 2
+    assert index.keys == {'LB-CL-002': 0, 'LB-DR-001': 1}
+    assert index.search('unicorn')[0]['key'] == 'LB-DR-001'
+
+
+def test_rare_exact_term_outranks_common_term(tmp_path):
+    index = build_index(tmp_path)
+    assert index.idf('labubu') == 0
+    results = index.search('pink labubu')
+    assert results[0]['key'] == 'LB-CL-001'
+    assert results[0]['score'] >= EXACT_WEIGHT
+    assert all(r['score'] < 1.0 for r in results[1:])
+
+
+def test_idf_falls_back_to_equal_weights_for_common_terms(tmp_path):
+    index = build_index(tmp_path)
+    results = index.search('labubu')
+    assert sorted(r['key'] for r in results) == sorted(m['model_number'] for m in MODELS)
+    assert all(r['score'] >= EXACT_WEIGHT for r in results)
+
+
+def test_save_load_round_trip(tmp_path):
+    index = build_index(tmp_path)
+    index.source_hash = 'abc'
+    index.remove('LB-CL-002')
+    index.save()
+
+    payload = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert payload['version'] == INDEX_VERSION
+    assert [doc['key'] for doc in payload['docs']] == ['LB-CL-001', 'LB-DR-001']
+
+    loaded = ModelSearchIndex(index.index_path)
+    assert loaded.load()
+    assert loaded.source_hash == 'abc'
+    assert loaded.keys == index.keys
+    assert loaded.postings == index.postings
+    assert loaded.search('pink labubu') == index.search('pink labubu')
+
+
+def test_load_rejects_other_version(tmp_path):
+    path = tmp_path / 'index.json'
+    path.write_text(json.dumps({'version': INDEX_VERSION - 1, 'pinyin': False, 'docs': []}), encoding='utf-8')
+    assert not ModelSearchIndex(str(path)).load()
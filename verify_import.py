@@ -4,8 +4,8 @@ Labubu数据验证脚本
 验证导入到Supabase的数据是否完整和正确
 """
 
-import requests
 import json
+import sys
 from typing import Dict, List, Any
 
 class LabubuDataVerifier:
@@ -16,21 +16,24 @@ class LabubuDataVerifier:
             'Authorization': f'Bearer {service_role_key}',
             'Content-Type': 'application/json'
         }
+        self.success = False  # generate_report后：数据获取成功且未发现问题
     
-    def verify_series(self) -> Dict[str, Any]:
-        """验证系列数据"""
+    def verify_table(self, table: str) -> Dict[str, Any]:
+        """读取整张表的数据"""
+        import requests
+        
         try:
             response = requests.get(
-                f"{self.supabase_url}/rest/v1/labubu_series",
+                f"{self.supabase_url}/rest/v1/{table}",
                 headers=self.headers
             )
             
             if response.status_code == 200:
-                series_data = response.json()
+                rows = response.json()
                 return {
                     'success': True,
-                    'count': len(series_data),
-                    'data': series_data
+                    'count': len(rows),
+                    'data': rows
                 }
             else:
                 return {
@@ -43,42 +46,28 @@ class LabubuDataVerifier:
                 'error': str(e)
             }
     
+    def verify_series(self) -> Dict[str, Any]:
+        """验证系列数据"""
+        return self.verify_table('labubu_series')
+    
     def verify_models(self) -> Dict[str, Any]:
         """验证模型数据"""
-        try:
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/labubu_models",
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                models_data = response.json()
-                return {
-                    'success': True,
-                    'count': len(models_data),
-                    'data': models_data
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': f"HTTP {response.status_code}: {response.text}"
-                }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        return self.verify_table('labubu_models')
     
-    def check_data_integrity(self, series_result: Dict, models_result: Dict) -> List[str]:
-        """检查数据完整性"""
+    def check_data_integrity(self, series_result: Dict, models_result: Dict,
+                             images_result: Dict, features_result: Dict) -> List[str]:
+        """检查数据完整性；参考图片与视觉特征按model_id关联到模型"""
         issues = []
         
-        if not series_result['success'] or not models_result['success']:
+        results = (series_result, models_result, images_result, features_result)
+        if not all(result['success'] for result in results):
             issues.append("❌ 数据获取失败")
             return issues
         
         series_data = series_result['data']
         models_data = models_result['data']
+        image_model_ids = {image.get('model_id') for image in images_result['data']}
+        feature_model_ids = {features.get('model_id') for features in features_result['data']}
         
         # 检查系列数据
         series_ids = set()
@@ -98,20 +87,18 @@ class LabubuDataVerifier:
                 issues.append(f"⚠️ 模型 {model.get('name', 'Unknown')} 的系列ID不存在")
             
             # 检查必需字段
-            required_fields = ['name', 'name_cn', 'rarity', 'visual_features']
+            required_fields = ['name', 'name_en', 'rarity_level']
             for field in required_fields:
                 if not model.get(field):
                     issues.append(f"⚠️ 模型 {model.get('name', 'Unknown')} 缺少字段: {field}")
             
             # 检查参考图片
-            ref_images = model.get('reference_images', [])
-            if len(ref_images) == 0:
+            if model.get('id') not in image_model_ids:
                 issues.append(f"⚠️ 模型 {model.get('name', 'Unknown')} 没有参考图片")
             
             # 检查视觉特征
-            visual_features = model.get('visual_features', {})
-            if not visual_features.get('feature_vector'):
-                issues.append(f"⚠️ 模型 {model.get('name', 'Unknown')} 缺少特征向量")
+            if model.get('id') not in feature_model_ids:
+                issues.append(f"⚠️ 模型 {model.get('name', 'Unknown')} 缺少视觉特征")
         
         return issues
     
@@ -127,9 +114,15 @@ class LabubuDataVerifier:
         print("🎭 验证模型数据...")
         models_result = self.verify_models()
         
+        # 验证参考图片与视觉特征
+        print("🖼️ 验证参考图片与视觉特征...")
+        images_result = self.verify_table('labubu_reference_images')
+        features_result = self.verify_table('labubu_visual_features')
+        
         # 检查完整性
         print("🔧 检查数据完整性...")
-        issues = self.check_data_integrity(series_result, models_result)
+        issues = self.check_data_integrity(series_result, models_result, images_result, features_result)
+        self.success = not issues
         
         # 生成报告
         report = "=== Labubu数据验证报告 ===\n\n"
@@ -144,7 +137,13 @@ class LabubuDataVerifier:
             report += f"✅ 模型数量: {models_result['count']}\n"
         else:
             report += f"❌ 模型数据获取失败: {models_result['error']}\n"
-        
+
+        for label, result in (('参考图片', images_result), ('视觉特征', features_result)):
+            if result['success']:
+                report += f"✅ {label}数量: {result['count']}\n"
+            else:
+                report += f"❌ {label}数据获取失败: {result['error']}\n"
+
         report += "\n"
         
         # 数据质量问题
@@ -164,7 +163,7 @@ class LabubuDataVerifier:
             # 按稀有度统计
             rarity_stats = {}
             for model in models_data:
-                rarity = model.get('rarity', 'unknown')
+                rarity = model.get('rarity_level', 'unknown')
                 rarity_stats[rarity] = rarity_stats.get(rarity, 0) + 1
             
             report += "📊 稀有度分布:\n"
@@ -191,28 +190,9 @@ class LabubuDataVerifier:
         return report
 
 def main():
-    """主函数"""
-    print("=== Labubu数据验证工具 ===\n")
-    
-    # 配置信息
-    SUPABASE_URL = input("请输入Supabase URL: ").strip()
-    SERVICE_ROLE_KEY = input("请输入Service Role Key: ").strip()
-    
-    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
-        print("❌ 配置信息不完整，请重新运行脚本")
-        return
-    
-    # 创建验证器并生成报告
-    verifier = LabubuDataVerifier(SUPABASE_URL, SERVICE_ROLE_KEY)
-    report = verifier.generate_report()
-    
-    print("\n" + report)
-    
-    # 保存报告到文件
-    with open('labubu_verification_report.txt', 'w', encoding='utf-8') as f:
-        f.write(report)
-    
-    print("📄 验证报告已保存到: labubu_verification_report.txt")
+    """主函数，等同于 python labubu_cli.py verify"""
+    from labubu_cli import main as cli_main
+    sys.exit(cli_main(['verify'] + sys.argv[1:]))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file